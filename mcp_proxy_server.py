@@ -2,15 +2,26 @@
 import json
 import sys
 import os
+import re
+import mmap
+import sqlite3
 from pathlib import Path
+from collections import Counter, OrderedDict, deque
 from datetime import datetime
 from typing import Any
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 JSONRPC_VERSION = "2.0"
 MCP_VERSION = "2024-11-05"
 
 TRAFFIC_DIR = Path("/var/mitmproxy/traffic")
 INDEX_FILE = TRAFFIC_DIR / "index.json"
+INDEX_LOG_FILE = TRAFFIC_DIR / "index.jsonl"
+DB_FILE = TRAFFIC_DIR / "traffic.db"
 
 
 def log_debug(msg: str):
@@ -18,6 +29,39 @@ def log_debug(msg: str):
     print(f"[DEBUG] {msg}", file=sys.stderr)
 
 
+_db_conn = None
+
+
+def get_db():
+    """Return a cached connection to the traffic database, or None if absent.
+
+    The addon writes in WAL mode, so this connection sees new flows as they
+    are committed.
+    """
+    global _db_conn
+    if _db_conn is None and DB_FILE.exists():
+        try:
+            _db_conn = sqlite3.connect(DB_FILE)
+        except sqlite3.Error:
+            _db_conn = None
+    return _db_conn
+
+
+def json_dumps(obj, indent: bool = False) -> str:
+    """Serialize to JSON, using orjson when available."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+def json_loads(data):
+    """Parse JSON from str or bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def clear_traffic():
     """Clear all captured mitmproxy traffic."""
     import shutil
@@ -27,41 +71,112 @@ def clear_traffic():
                 if f.name != "index.json":
                     f.unlink()
         with open(INDEX_FILE, 'w') as f:
-            json.dump({"requests": []}, f)
+            f.write(json_dumps({"requests": []}))
+        with open(INDEX_LOG_FILE, 'w') as f:
+            pass  # Truncate the append-only log
+        db = get_db()
+        if db is not None:
+            for table in ("flows", "flow_search", "stats"):
+                try:
+                    db.execute(f"DELETE FROM {table}")
+                except sqlite3.Error:
+                    pass  # Table may not exist in older databases
+            db.commit()
+        _request_cache.clear()
         log_debug("Mitmproxy traffic cleared")
     except Exception as e:
         log_debug(f"Error clearing traffic: {e}")
 
 
-def read_index() -> dict:
-    """Read the traffic index file."""
+def _read_legacy_index() -> dict:
+    """Read the whole-file index.json left by older captures."""
     if not INDEX_FILE.exists():
         return {"requests": []}
     try:
-        with open(INDEX_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
+        with open(INDEX_FILE, 'rb') as f:
+            return json_loads(f.read())
+    except (ValueError, IOError):
         return {"requests": []}
 
 
+def iter_index():
+    """Yield index entries one at a time without materializing the full index."""
+    if INDEX_LOG_FILE.exists():
+        yielded = False
+        try:
+            with open(INDEX_LOG_FILE, 'rb') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yielded = True
+                        yield json_loads(line)
+        except (ValueError, IOError):
+            return
+        if yielded:
+            return
+        # The addon creates an empty log on startup; an empty log over a
+        # directory of legacy captures means the legacy index still applies.
+    yield from _read_legacy_index().get("requests", [])
+
+
+def read_index() -> dict:
+    """Read the full traffic index."""
+    return {"requests": list(iter_index())}
+
+
+# Captured flows are immutable, so recently read ones can be cached.
+REQUEST_CACHE_SIZE = 128
+_request_cache = OrderedDict()
+
+
 def read_request(request_id: str) -> dict | None:
     """Read a specific request/response by ID."""
+    cached = _request_cache.get(request_id)
+    if cached is not None:
+        _request_cache.move_to_end(request_id)
+        return cached
+
+    data = _load_request(request_id)
+    if data is not None:
+        _request_cache[request_id] = data
+        if len(_request_cache) > REQUEST_CACHE_SIZE:
+            _request_cache.popitem(last=False)
+    return data
+
+
+def _load_request(request_id: str) -> dict | None:
+    """Load a request/response from the database or a legacy per-request file."""
+    db = get_db()
+    if db is not None:
+        try:
+            row = db.execute(
+                "SELECT data FROM flows WHERE id = ?", (request_id,)
+            ).fetchone()
+            if row is not None:
+                return json_loads(row[0])
+        except sqlite3.Error:
+            pass
+    # Per-request files from captures predating the database.
     request_file = TRAFFIC_DIR / f"{request_id}.json"
     if not request_file.exists():
         return None
     try:
-        with open(request_file, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
+        with open(request_file, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return json_loads(bytes(mm))
+    except (ValueError, OSError):
         return None
 
 
 def send_response(response: dict):
     """Send a JSON-RPC response."""
     response["jsonrpc"] = JSONRPC_VERSION
-    output = json.dumps(response)
-    sys.stdout.write(output + "\n")
-    sys.stdout.flush()
+    if orjson is not None:
+        output = orjson.dumps(response)
+    else:
+        output = json.dumps(response).encode()
+    sys.stdout.buffer.write(output + b"\n")
+    sys.stdout.buffer.flush()
 
 
 def handle_initialize(request_id: Any, params: dict) -> dict:
@@ -82,108 +197,112 @@ def handle_initialize(request_id: Any, params: dict) -> dict:
     }
 
 
-def handle_tools_list(request_id: Any) -> dict:
-    """Return the list of available tools."""
-    tools = [
-        {
-            "name": "list_requests",
-            "description": "List all captured HTTP requests with summary information. Returns request ID, timestamp, method, URL, host, status code, and content sizes. Use the request ID with read_request to get full details.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "limit": {
-                        "type": "integer",
-                        "description": "Maximum number of requests to return (default: 100, use 0 for all)"
-                    },
-                    "host_filter": {
-                        "type": "string",
-                        "description": "Filter requests by host (partial match)"
-                    },
-                    "method_filter": {
-                        "type": "string",
-                        "description": "Filter requests by HTTP method (GET, POST, etc.)"
-                    },
-                    "status_filter": {
-                        "type": "integer",
-                        "description": "Filter requests by status code"
-                    },
-                    "url_filter": {
-                        "type": "string",
-                        "description": "Filter requests by URL (partial match)"
-                    }
+# Tool descriptors are static, so build the payload once at import time
+# instead of on every tools/list request.
+TOOLS = [
+    {
+        "name": "list_requests",
+        "description": "List all captured HTTP requests with summary information. Returns request ID, timestamp, method, URL, host, status code, and content sizes. Use the request ID with read_request to get full details.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of requests to return (default: 100, use 0 for all)"
                 },
-                "required": []
-            }
-        },
-        {
-            "name": "read_request",
-            "description": "Read the full details of a specific captured request/response, including all headers and body content. Use list_requests first to get the request ID.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "request_id": {
-                        "type": "string",
-                        "description": "The unique ID of the request to read (from list_requests)"
-                    }
+                "host_filter": {
+                    "type": "string",
+                    "description": "Filter requests by host (partial match)"
                 },
-                "required": ["request_id"]
-            }
-        },
-        {
-            "name": "search_requests",
-            "description": "Search through captured requests by content. Searches both request and response bodies.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "Search query to find in request/response bodies"
-                    },
-                    "search_headers": {
-                        "type": "boolean",
-                        "description": "Also search in headers (default: false)"
-                    }
+                "method_filter": {
+                    "type": "string",
+                    "description": "Filter requests by HTTP method (GET, POST, etc.)"
                 },
-                "required": ["query"]
-            }
-        },
-        {
-            "name": "clear_requests",
-            "description": "Clear all captured requests. Use with caution - this deletes all stored traffic data.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        },
-        {
-            "name": "get_request_stats",
-            "description": "Get statistics about captured traffic including total requests, requests by host, by method, and by status code.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        },
-        {
-            "name": "export_har",
-            "description": "Export captured traffic in HAR (HTTP Archive) format for use with other tools.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "request_ids": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "List of request IDs to export. If empty, exports all."
-                    }
+                "status_filter": {
+                    "type": "integer",
+                    "description": "Filter requests by status code"
                 },
-                "required": []
-            }
+                "url_filter": {
+                    "type": "string",
+                    "description": "Filter requests by URL (partial match; separate alternatives with |)"
+                }
+            },
+            "required": []
         }
-    ]
+    },
+    {
+        "name": "read_request",
+        "description": "Read the full details of a specific captured request/response, including all headers and body content. Use list_requests first to get the request ID.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "request_id": {
+                    "type": "string",
+                    "description": "The unique ID of the request to read (from list_requests)"
+                }
+            },
+            "required": ["request_id"]
+        }
+    },
+    {
+        "name": "search_requests",
+        "description": "Search through captured requests by content. Searches both request and response bodies.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query to find in request/response bodies"
+                },
+                "search_headers": {
+                    "type": "boolean",
+                    "description": "Also search in headers (default: false)"
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    {
+        "name": "clear_requests",
+        "description": "Clear all captured requests. Use with caution - this deletes all stored traffic data.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    },
+    {
+        "name": "get_request_stats",
+        "description": "Get statistics about captured traffic including total requests, requests by host, by method, and by status code.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    },
+    {
+        "name": "export_har",
+        "description": "Export captured traffic in HAR (HTTP Archive) format for use with other tools.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "request_ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "List of request IDs to export. If empty, exports all."
+                }
+            },
+            "required": []
+        }
+    }
+]
+
+
+def handle_tools_list(request_id: Any) -> dict:
+    """Return the list of available tools."""
     return {
         "id": request_id,
-        "result": {"tools": tools}
+        "result": {"tools": TOOLS}
     }
 
 
@@ -195,31 +314,96 @@ def handle_resources_list(request_id: Any) -> dict:
     }
 
 
+def _like_escape(text: str) -> str:
+    """Escape LIKE wildcards so filter text matches literally."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _list_requests_db(host_filter, method_filter, status_filter, url_filter, limit):
+    """Run the list_requests filters as a SQL query, or return None if unavailable."""
+    db = get_db()
+    if db is None:
+        return None
+
+    where = []
+    args = []
+    if host_filter:
+        where.append("host LIKE ? ESCAPE '\\'")
+        args.append(f"%{_like_escape(host_filter)}%")
+    if method_filter:
+        where.append("upper(method) = ?")
+        args.append(method_filter)
+    if status_filter:
+        where.append("status_code = ?")
+        args.append(status_filter)
+    if url_filter:
+        patterns = url_filter.split("|")
+        where.append("(" + " OR ".join(["url LIKE ? ESCAPE '\\'"] * len(patterns)) + ")")
+        args.extend(f"%{_like_escape(p)}%" for p in patterns)
+
+    sql = ("SELECT id, timestamp, method, url, host, status_code, content_type, "
+           "request_size, response_size FROM flows")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY rowid DESC"
+    if limit > 0:
+        sql += " LIMIT ?"
+        args.append(limit)
+
+    try:
+        # An empty table means the capture predates the database; fall back
+        # like _request_stats_db does.
+        if not db.execute("SELECT EXISTS(SELECT 1 FROM flows)").fetchone()[0]:
+            return None
+        rows = db.execute(sql, args).fetchall()
+    except sqlite3.Error:
+        return None
+
+    columns = ("id", "timestamp", "method", "url", "host", "status_code",
+               "content_type", "request_size", "response_size")
+    # Rows come back newest-first; flip to chronological order for display.
+    return [dict(zip(columns, row)) for row in reversed(rows)]
+
+
 def tool_list_requests(params: dict) -> str:
     """List captured requests with optional filtering."""
-    index = read_index()
-    requests = index.get("requests", [])
-
     host_filter = params.get("host_filter", "").lower()
     method_filter = params.get("method_filter", "").upper()
     status_filter = params.get("status_filter")
     url_filter = params.get("url_filter", "").lower()
     limit = params.get("limit", 100)
 
-    filtered = []
-    for req in requests:
-        if host_filter and host_filter not in req.get("host", "").lower():
-            continue
-        if method_filter and req.get("method", "").upper() != method_filter:
-            continue
-        if status_filter and req.get("status_code") != status_filter:
-            continue
-        if url_filter and url_filter not in req.get("url", "").lower():
-            continue
-        filtered.append(req)
-
-    if limit > 0:
-        filtered = filtered[-limit:]  # Get most recent
+    filtered = _list_requests_db(host_filter, method_filter, status_filter,
+                                 url_filter, limit)
+    if filtered is None:
+        # No database: stream the index, keeping the most recent `limit` matches.
+        # Alternative URL patterns are compiled into one regex so each row
+        # is scanned once regardless of the pattern count.
+        url_re = None
+        if url_filter:
+            url_re = re.compile("|".join(
+                re.escape(p) for p in url_filter.split("|")))
+        filtered = deque(maxlen=limit if limit > 0 else None)
+        for req in iter_index():
+            # Prefer the lowercased copies written by the addon; older
+            # entries without them are lowered here.
+            if host_filter:
+                host = req.get("host_lc")
+                if host is None:
+                    host = req.get("host", "").lower()
+                if host_filter not in host:
+                    continue
+            if method_filter and req.get("method", "").upper() != method_filter:
+                continue
+            if status_filter and req.get("status_code") != status_filter:
+                continue
+            if url_re is not None:
+                url = req.get("url_lc")
+                if url is None:
+                    url = req.get("url", "").lower()
+                if url_re.search(url) is None:
+                    continue
+            filtered.append(req)
 
     if not filtered:
         return "No requests captured yet. Configure your browser to use the proxy at localhost:8888."
@@ -289,6 +473,40 @@ def tool_read_request(params: dict) -> str:
     return "\n".join(output)
 
 
+def _search_candidate_ids(query: str, search_headers: bool) -> list | None:
+    """Look up candidate request IDs in the full-text search index.
+
+    Returns None when the index is unavailable so the caller can fall back
+    to scanning the captured files directly.
+    """
+    db = get_db()
+    if db is None:
+        return None
+    # Trigram FTS cannot match substrings shorter than three characters.
+    if len(query) < 3:
+        return None
+    try:
+        # Only trust the index when it was built with the trigram tokenizer;
+        # token-based tables from older captures miss substring matches.
+        row = db.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'flow_search'"
+        ).fetchone()
+        if row is None or 'trigram' not in row[0]:
+            return None
+        # An empty table means the capture predates the database; fall back
+        # like _request_stats_db does.
+        if not db.execute("SELECT EXISTS(SELECT 1 FROM flow_search)").fetchone()[0]:
+            return None
+        columns = "{url body headers}" if search_headers else "{url body}"
+        match = f'{columns} : "{query.replace(chr(34), chr(34) * 2)}"'
+        rows = db.execute(
+            "SELECT id FROM flow_search WHERE flow_search MATCH ?", (match,)
+        ).fetchall()
+        return [row[0] for row in rows]
+    except sqlite3.Error:
+        return None
+
+
 def tool_search_requests(params: dict) -> str:
     """Search through captured requests."""
     query = params.get("query", "").lower()
@@ -297,11 +515,33 @@ def tool_search_requests(params: dict) -> str:
     if not query:
         return "Error: query is required"
 
-    index = read_index()
-    matches = []
+    candidate_ids = _search_candidate_ids(query, search_headers)
+    if candidate_ids is None:
+        # Legacy files store quotes, backslashes and non-ASCII characters
+        # JSON-escaped, so the raw-byte prefilter only works when the query
+        # appears in the file exactly as typed.
+        if json.dumps(query)[1:-1] != query:
+            candidate_ids = [r["id"] for r in iter_index()]
+        else:
+            # No search index yet: pre-filter by scanning the raw file bytes
+            # via mmap so non-matching files are skipped without being parsed.
+            candidate_ids = []
+            pattern = re.compile(re.escape(query.encode()), re.IGNORECASE)
+            for req_summary in iter_index():
+                request_file = TRAFFIC_DIR / f"{req_summary['id']}.json"
+                try:
+                    with open(request_file, 'rb') as f:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            if pattern.search(mm) is not None:
+                                candidate_ids.append(req_summary["id"])
+                except (ValueError, OSError):
+                    # No per-request file: the flow may live in the database,
+                    # so let the parse-and-verify step below decide.
+                    candidate_ids.append(req_summary["id"])
 
-    for req_summary in index.get("requests", []):
-        data = read_request(req_summary["id"])
+    matches = []
+    for req_id in candidate_ids:
+        data = read_request(req_id)
         if data is None:
             continue
 
@@ -328,9 +568,9 @@ def tool_search_requests(params: dict) -> str:
 
         if found_in:
             matches.append({
-                "id": req_summary["id"],
-                "method": req_summary["method"],
-                "url": req_summary["url"],
+                "id": req_id,
+                "method": data["request"].get("method", ""),
+                "url": data["request"].get("url", ""),
                 "found_in": found_in
             })
 
@@ -353,34 +593,58 @@ def tool_clear_requests(params: dict) -> str:
     return "All captured requests have been cleared."
 
 
-def tool_get_request_stats(params: dict) -> str:
-    """Get statistics about captured traffic."""
-    index = read_index()
-    requests = index.get("requests", [])
-
-    if not requests:
-        return "No requests captured yet."
-
-    total = len(requests)
-    by_host = {}
-    by_method = {}
-    by_status = {}
-    total_request_size = 0
-    total_response_size = 0
-
-    for req in requests:
-        host = req.get("host", "unknown")
-        by_host[host] = by_host.get(host, 0) + 1
+def _request_stats_db():
+    """Read the addon's running aggregates, or return None if unavailable."""
+    db = get_db()
+    if db is None:
+        return None
+    try:
+        rows = db.execute("SELECT category, key, value FROM stats").fetchall()
+    except sqlite3.Error:
+        return None
+    if not rows:
+        return None
 
-        method = req.get("method", "unknown")
-        by_method[method] = by_method.get(method, 0) + 1
+    counters = {"total": Counter(), "host": Counter(),
+                "method": Counter(), "status": Counter()}
+    for category, key, value in rows:
+        if category in counters:
+            counters[category][key] = value
+    return counters
 
-        status = req.get("status_code", 0)
-        status_group = f"{status // 100}xx"
-        by_status[status_group] = by_status.get(status_group, 0) + 1
 
-        total_request_size += req.get("request_size", 0)
-        total_response_size += req.get("response_size", 0)
+def tool_get_request_stats(params: dict) -> str:
+    """Get statistics about captured traffic."""
+    counters = _request_stats_db()
+    if counters is not None:
+        total = counters["total"]["requests"]
+        total_request_size = counters["total"]["request_bytes"]
+        total_response_size = counters["total"]["response_bytes"]
+        by_host = counters["host"]
+        by_method = counters["method"]
+        by_status = counters["status"]
+    else:
+        # No precomputed aggregates: single streaming pass over the index.
+        total = 0
+        by_host = Counter()
+        by_method = Counter()
+        by_status = Counter()
+        total_request_size = 0
+        total_response_size = 0
+
+        for req in iter_index():
+            total += 1
+            by_host[req.get("host", "unknown")] += 1
+            by_method[req.get("method", "unknown")] += 1
+
+            status = req.get("status_code", 0)
+            by_status[f"{status // 100}xx"] += 1
+
+            total_request_size += req.get("request_size", 0)
+            total_response_size += req.get("response_size", 0)
+
+    if total == 0:
+        return "No requests captured yet."
 
     lines = [
         f"=== Traffic Statistics ===",
@@ -391,12 +655,13 @@ def tool_get_request_stats(params: dict) -> str:
         "By Host (top 10):",
     ]
 
-    for host, count in sorted(by_host.items(), key=lambda x: -x[1])[:10]:
+    # most_common(10) is a bounded heap selection, not a full sort.
+    for host, count in by_host.most_common(10):
         lines.append(f"  {host}: {count}")
 
     lines.append("")
     lines.append("By Method:")
-    for method, count in sorted(by_method.items(), key=lambda x: -x[1]):
+    for method, count in by_method.most_common():
         lines.append(f"  {method}: {count}")
 
     lines.append("")
@@ -418,7 +683,9 @@ def tool_export_har(params: dict) -> str:
     if not request_ids:
         return "No requests to export."
 
-    entries = []
+    # Serialize each entry as soon as it is built so only one entry dict is
+    # alive at a time; the pieces are spliced into the HAR envelope below.
+    entry_parts = []
     for req_id in request_ids:
         data = read_request(req_id)
         if data is None:
@@ -427,17 +694,31 @@ def tool_export_har(params: dict) -> str:
         req = data["request"]
         resp = data["response"]
 
+        # Build each header list and pick out the content type in one pass.
+        req_headers = []
+        req_mime = ""
+        for k, v in req["headers"].items():
+            req_headers.append({"name": k, "value": v})
+            if k.lower() == "content-type":
+                req_mime = v
+        resp_headers = []
+        resp_mime = ""
+        for k, v in resp["headers"].items():
+            resp_headers.append({"name": k, "value": v})
+            if k.lower() == "content-type":
+                resp_mime = v
+
         entry = {
             "startedDateTime": data["timestamp"],
             "request": {
                 "method": req["method"],
                 "url": req["url"],
                 "httpVersion": "HTTP/1.1",
-                "headers": [{"name": k, "value": v} for k, v in req["headers"].items()],
+                "headers": req_headers,
                 "queryString": [],
                 "bodySize": req["content_length"],
                 "postData": {
-                    "mimeType": req["headers"].get("content-type", ""),
+                    "mimeType": req_mime,
                     "text": req["content"]
                 } if req["content"] else None
             },
@@ -445,10 +726,10 @@ def tool_export_har(params: dict) -> str:
                 "status": resp["status_code"],
                 "statusText": resp["reason"],
                 "httpVersion": "HTTP/1.1",
-                "headers": [{"name": k, "value": v} for k, v in resp["headers"].items()],
+                "headers": resp_headers,
                 "content": {
                     "size": resp["content_length"],
-                    "mimeType": resp["headers"].get("content-type", ""),
+                    "mimeType": resp_mime,
                     "text": resp["content"]
                 },
                 "bodySize": resp["content_length"]
@@ -456,17 +737,12 @@ def tool_export_har(params: dict) -> str:
             "cache": {},
             "timings": {"wait": 0, "receive": 0}
         }
-        entries.append(entry)
-
-    har = {
-        "log": {
-            "version": "1.2",
-            "creator": {"name": "mitmproxy-mcp", "version": "1.0.0"},
-            "entries": entries
-        }
-    }
+        entry_parts.append(json_dumps(entry))
 
-    return json.dumps(har, indent=2)
+    har_open = ('{"log": {"version": "1.2", '
+                '"creator": {"name": "mitmproxy-mcp", "version": "1.0.0"}, '
+                '"entries": [')
+    return har_open + ", ".join(entry_parts) + "]}}"
 
 
 
@@ -518,9 +794,13 @@ def main():
 
     log_debug("MCP Proxy Server started")
 
+    # Read newline-delimited frames from the buffered binary stream; the
+    # bytes go straight to the JSON parser without a text-layer decode.
+    stdin = sys.stdin.buffer
+
     while True:
         try:
-            line = sys.stdin.readline()
+            line = stdin.readline()
             if not line:
                 break
 
@@ -529,8 +809,8 @@ def main():
                 continue
 
             try:
-                request = json.loads(line)
-            except json.JSONDecodeError as e:
+                request = json_loads(line)
+            except ValueError as e:
                 log_debug(f"JSON decode error: {e}")
                 continue
 
@@ -4,14 +4,55 @@ Mitmproxy addon that captures HTTP/HTTPS traffic and stores it for the MCP serve
 import json
 import os
 import time
+import queue
 import hashlib
+import sqlite3
+import threading
 from datetime import datetime
 from pathlib import Path
 from mitmproxy import http, ctx
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_dumps(obj, indent: bool = False) -> str:
+    """Serialize to JSON, using orjson when available."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+def json_dumps_bytes(obj) -> bytes:
+    """Serialize to JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def json_loads(data):
+    """Parse JSON from str or bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 # Directory to store captured traffic
 TRAFFIC_DIR = Path("/var/mitmproxy/traffic")
 
+# Content types that indicate binary payloads we don't decode: whole main
+# types, plus specific application subtypes.
+BINARY_MAIN_TYPES = frozenset({'image', 'audio', 'video'})
+BINARY_EXACT_TYPES = frozenset({'application/octet-stream', 'application/pdf',
+                                'application/zip', 'application/gzip'})
+
+# Bodies above this size are truncated before decoding so a single huge
+# response can't blow up the index log, the database or the search index.
+MAX_INLINE_BODY = 1024 * 1024
+
 
 class TrafficCapture:
     """Addon to capture and store HTTP traffic for MCP server access."""
@@ -20,28 +61,108 @@ class TrafficCapture:
         self.traffic_dir = TRAFFIC_DIR
         self.traffic_dir.mkdir(parents=True, exist_ok=True)
         self.index_file = self.traffic_dir / "index.json"
+        self.index_log_file = self.traffic_dir / "index.jsonl"
+        self.db_file = self.traffic_dir / "traffic.db"
         self._load_index()
+        self._init_db()
+        # All disk writes happen on this thread so response() never blocks
+        # the proxy loop on I/O.
+        self._write_queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        # Append-only log: one JSON line per captured flow, written with a
+        # single os.write on a raw O_APPEND fd — no text encoding layer or
+        # stream buffering in the hot path.
+        self._index_log_fd = os.open(
+            self.index_log_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
 
     def _load_index(self):
-        """Load existing index or create new one."""
+        """Load existing index into memory from the JSONL log (or legacy index.json)."""
+        self.index = {"requests": []}
+        if self.index_log_file.exists():
+            try:
+                with open(self.index_log_file, 'rb') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            self.index["requests"].append(json_loads(line))
+                # An empty log (created by a previous startup) over legacy
+                # captures means the legacy index still applies.
+                if self.index["requests"]:
+                    return
+            except (ValueError, IOError):
+                self.index = {"requests": []}
         if self.index_file.exists():
             try:
-                with open(self.index_file, 'r') as f:
-                    self.index = json.load(f)
-            except (json.JSONDecodeError, IOError):
+                with open(self.index_file, 'rb') as f:
+                    self.index = json_loads(f.read())
+            except (ValueError, IOError):
                 self.index = {"requests": []}
-        else:
-            self.index = {"requests": []}
+
+    def _init_db(self):
+        """Open the sqlite database in WAL mode and create the tables."""
+        self._db = sqlite3.connect(self.db_file, check_same_thread=False)
+        # WAL lets the MCP server read while the proxy keeps writing, and
+        # synchronous=NORMAL skips the per-commit WAL fsync — losing the last
+        # few flows on power loss is fine for a capture cache.
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS flows ("
+            "id TEXT PRIMARY KEY, timestamp TEXT, method TEXT, url TEXT, "
+            "host TEXT, status_code INTEGER, content_type TEXT, "
+            "request_size INTEGER, response_size INTEGER, data TEXT)"
+        )
+        # The trigram tokenizer makes MATCH behave like a substring search,
+        # which is what the search tool promises; rebuild older token-based
+        # tables so existing captures keep the same semantics.
+        rebuild = False
+        row = self._db.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'flow_search'"
+        ).fetchone()
+        if row is not None and 'trigram' not in row[0]:
+            self._db.execute("DROP TABLE flow_search")
+            rebuild = True
+        try:
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS flow_search "
+                "USING fts5(id UNINDEXED, url, body, headers, tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            # sqlite < 3.34: no trigram tokenizer; the MCP server detects
+            # this and falls back to scanning files instead of trusting FTS.
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS flow_search "
+                "USING fts5(id UNINDEXED, url, body, headers)"
+            )
+        if rebuild:
+            self._db.execute(
+                "INSERT INTO flow_search (id, url, body, headers) "
+                "SELECT id, url, "
+                "json_extract(data, '$.request.content') || ' ' || "
+                "json_extract(data, '$.response.content'), "
+                "json_extract(data, '$.request.headers') || ' ' || "
+                "json_extract(data, '$.response.headers') FROM flows"
+            )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS stats ("
+            "category TEXT, key TEXT, value INTEGER, "
+            "PRIMARY KEY (category, key))"
+        )
+        self._db.commit()
 
     def _save_index(self):
-        """Save the index to disk."""
+        """Write a consolidated copy of the in-memory index to disk."""
         with open(self.index_file, 'w') as f:
-            json.dump(self.index, f, indent=2)
+            f.write(json_dumps(self.index))
 
     def _generate_id(self, flow: http.HTTPFlow) -> str:
         """Generate a unique ID for a request/response pair."""
         unique_str = f"{flow.request.method}{flow.request.pretty_url}{time.time()}"
-        return hashlib.sha256(unique_str.encode()).hexdigest()[:16]
+        # blake2b is much faster than sha256 and an 8-byte digest gives the
+        # same 16-hex-char IDs as before; this is an identifier, not a
+        # security boundary.
+        return hashlib.blake2b(unique_str.encode(), digest_size=8).hexdigest()
 
     def _get_headers_dict(self, headers) -> dict:
         """Convert headers to a dictionary."""
@@ -52,20 +173,28 @@ class TrafficCapture:
         if content is None:
             return ""
 
-        # Check if content is likely binary
-        binary_types = ['image/', 'audio/', 'video/', 'application/octet-stream',
-                       'application/pdf', 'application/zip', 'application/gzip']
-        for bt in binary_types:
-            if bt in content_type.lower():
-                return f"[Binary content: {len(content)} bytes, type: {content_type}]"
+        # Check if content is likely binary: strip any parameters, then do
+        # set lookups on the main type and the exact mime type.
+        mime = content_type.split(';', 1)[0].strip().lower()
+        if mime.split('/', 1)[0] in BINARY_MAIN_TYPES or mime in BINARY_EXACT_TYPES:
+            return f"[Binary content: {len(content)} bytes, type: {content_type}]"
+
+        # Slice through a memoryview so truncation doesn't copy the body,
+        # keeping per-flow memory bounded regardless of body size.
+        total = len(content)
+        view = memoryview(content)
+        if total > MAX_INLINE_BODY:
+            # The cut can split a multibyte sequence; replace just that
+            # character rather than failing the strict decode and garbling
+            # the whole slice as latin-1.
+            text = str(view[:MAX_INLINE_BODY], 'utf-8', 'replace')
+            return text + f"\n... [truncated, {total} total bytes]"
 
         try:
-            return content.decode('utf-8')
+            return str(view, 'utf-8')
         except UnicodeDecodeError:
-            try:
-                return content.decode('latin-1')
-            except UnicodeDecodeError:
-                return f"[Binary content: {len(content)} bytes]"
+            # latin-1 maps every byte value, so this cannot fail.
+            return str(view, 'latin-1')
 
     def response(self, flow: http.HTTPFlow):
         """Called when a response is received."""
@@ -79,6 +208,11 @@ class TrafficCapture:
         req_content_type = flow.request.headers.get("content-type", "")
         resp_content_type = flow.response.headers.get("content-type", "")
 
+        # Fetch each body exactly once: flow.*.content decodes the transfer
+        # encoding on access, so repeated reads re-do that work.
+        req_content = flow.request.content
+        resp_content = flow.response.content
+
         # Build the request data
         request_data = {
             "id": request_id,
@@ -91,23 +225,18 @@ class TrafficCapture:
                 "path": flow.request.path,
                 "scheme": flow.request.scheme,
                 "headers": self._get_headers_dict(flow.request.headers),
-                "content": self._safe_decode(flow.request.content, req_content_type),
-                "content_length": len(flow.request.content) if flow.request.content else 0,
+                "content": self._safe_decode(req_content, req_content_type),
+                "content_length": len(req_content) if req_content else 0,
             },
             "response": {
                 "status_code": flow.response.status_code,
                 "reason": flow.response.reason,
                 "headers": self._get_headers_dict(flow.response.headers),
-                "content": self._safe_decode(flow.response.content, resp_content_type),
-                "content_length": len(flow.response.content) if flow.response.content else 0,
+                "content": self._safe_decode(resp_content, resp_content_type),
+                "content_length": len(resp_content) if resp_content else 0,
             }
         }
 
-        # Save the full request/response to a file
-        request_file = self.traffic_dir / f"{request_id}.json"
-        with open(request_file, 'w') as f:
-            json.dump(request_data, f, indent=2)
-
         # Add to index (summary only)
         index_entry = {
             "id": request_id,
@@ -119,12 +248,87 @@ class TrafficCapture:
             "content_type": resp_content_type,
             "request_size": request_data["request"]["content_length"],
             "response_size": request_data["response"]["content_length"],
+            # Lowercased copies so list filters don't re-lower every row
+            # on every query.
+            "host_lc": flow.request.host.lower(),
+            "url_lc": flow.request.pretty_url.lower(),
         }
 
         self.index["requests"].append(index_entry)
-        self._save_index()
+        self._write_queue.put((request_data, index_entry))
 
         ctx.log.info(f"Captured: {flow.request.method} {flow.request.pretty_url} -> {flow.response.status_code}")
 
+    def _write_loop(self):
+        """Drain the write queue until the shutdown sentinel arrives."""
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                break
+            try:
+                self._persist(*item)
+            except Exception as e:
+                ctx.log.error(f"Failed to persist flow: {e}")
+            finally:
+                self._write_queue.task_done()
+
+    def _persist(self, request_data: dict, index_entry: dict):
+        """Write one captured flow to the index log and the database."""
+        os.write(self._index_log_fd, json_dumps_bytes(index_entry) + b"\n")
+
+        # Store the full flow keyed by id, alongside its full-text search
+        # row and the running aggregates; one transaction per flow.
+        self._db.execute(
+            "INSERT OR REPLACE INTO flows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                index_entry["id"],
+                index_entry["timestamp"],
+                index_entry["method"],
+                index_entry["url"],
+                index_entry["host"],
+                index_entry["status_code"],
+                index_entry["content_type"],
+                index_entry["request_size"],
+                index_entry["response_size"],
+                json_dumps(request_data),
+            ),
+        )
+        headers_text = " ".join(
+            f"{k}: {v}"
+            for headers in (request_data["request"]["headers"], request_data["response"]["headers"])
+            for k, v in headers.items()
+        )
+        self._db.execute(
+            "INSERT INTO flow_search (id, url, body, headers) VALUES (?, ?, ?, ?)",
+            (
+                index_entry["id"],
+                index_entry["url"],
+                request_data["request"]["content"] + " " + request_data["response"]["content"],
+                headers_text,
+            ),
+        )
+        self._db.executemany(
+            "INSERT INTO stats VALUES (?, ?, ?) ON CONFLICT(category, key) "
+            "DO UPDATE SET value = value + excluded.value",
+            [
+                ("total", "requests", 1),
+                ("total", "request_bytes", index_entry["request_size"]),
+                ("total", "response_bytes", index_entry["response_size"]),
+                ("host", index_entry["host"], 1),
+                ("method", index_entry["method"], 1),
+                ("status", f"{index_entry['status_code'] // 100}xx", 1),
+            ],
+        )
+        self._db.commit()
+
+    def done(self):
+        """Called on shutdown: drain pending writes, flush the consolidated
+        index.json, and close the log and database."""
+        self._write_queue.put(None)
+        self._writer.join()
+        self._save_index()
+        os.close(self._index_log_fd)
+        self._db.close()
+
 
 addons = [TrafficCapture()]